@@ -6,8 +6,10 @@ Loads from default list + optional config file or env override.
 from __future__ import annotations
 
 import fnmatch
+import functools
 import os
-from urllib.parse import urlparse
+import re
+from urllib.parse import ParseResult, urlparse
 
 
 # Default domains for research use. Extensible via config.
@@ -58,10 +60,9 @@ def _load_domains() -> list[str]:
     return domains
 
 
-def _normalize_host(url: str) -> str | None:
-    """Extract and normalize host from URL (lowercase, no port)."""
+def _normalize_host(parsed: ParseResult) -> str | None:
+    """Extract and normalize host from parsed URL (lowercase, no port)."""
     try:
-        parsed = urlparse(url)
         host = (parsed.hostname or parsed.netloc or "").lower()
         # Strip port if present
         if ":" in host:
@@ -71,12 +72,75 @@ def _normalize_host(url: str) -> str | None:
         return None
 
 
-def _host_matches_pattern(host: str, pattern: str) -> bool:
-    """Check if host matches pattern. Supports *.domain for subdomains."""
-    return fnmatch.fnmatch(host, pattern)
+class _TrieNode:
+    """Trie node keyed by DNS label. Terminal nodes come from *.suffix rules."""
+
+    __slots__ = ("children", "is_terminal")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.is_terminal = False
+
+
+class _Matcher:
+    """
+    Compiled allowlist. Exact hosts go in a set; *.suffix rules go in a trie
+    of reversed labels (gov -> nih -> nlm -> ncbi), so lookup is O(labels)
+    regardless of allowlist size. Any other glob falls back to one regex.
+    """
+
+    __slots__ = ("exact", "suffixes", "globs")
+
+    def __init__(self, domains: list[str]) -> None:
+        exact: set[str] = set()
+        globs: list[str] = []
+        self.suffixes = _TrieNode()
+        for pattern in domains:
+            pattern = pattern.lower()
+            suffix = pattern[2:] if pattern.startswith("*.") else None
+            if suffix and not _has_glob_chars(suffix):
+                self._add_suffix(suffix)
+            elif not _has_glob_chars(pattern):
+                exact.add(pattern)
+            else:
+                globs.append(pattern)
+        self.exact = frozenset(exact)
+        self.globs = (
+            re.compile("|".join("(?:%s)" % fnmatch.translate(p) for p in globs))
+            if globs
+            else None
+        )
+
+    def _add_suffix(self, suffix: str) -> None:
+        node = self.suffixes
+        rest = suffix
+        while rest:
+            rest, _, label = rest.rpartition(".")
+            node = node.children.setdefault(label, _TrieNode())
+        node.is_terminal = True
+
+    def matches(self, host: str) -> bool:
+        if host in self.exact:
+            return True
+        node = self.suffixes
+        rest = host
+        while rest:
+            rest, _, label = rest.rpartition(".")
+            node = node.children.get(label)
+            if node is None:
+                break
+            # *.suffix needs at least one more label in front of the suffix
+            if node.is_terminal and rest:
+                return True
+        return self.globs is not None and self.globs.match(host) is not None
+
+
+def _has_glob_chars(pattern: str) -> bool:
+    return any(c in pattern for c in "*?[")
 
 
 _cached_domains: list[str] | None = None
+_matcher: _Matcher | None = None
 
 
 def _get_domains() -> list[str]:
@@ -87,32 +151,51 @@ def _get_domains() -> list[str]:
     return _cached_domains
 
 
+def _get_matcher() -> _Matcher:
+    """Lazy-build and cache the allowlist matcher."""
+    global _matcher
+    if _matcher is None:
+        _matcher = _Matcher(_get_domains())
+    return _matcher
+
+
+@functools.lru_cache(maxsize=4096)
+def _host_is_allowed(host: str) -> bool:
+    """Return True if normalized host is on the allowlist. Cached per host."""
+    return _get_matcher().matches(host)
+
+
 def is_allowed(url: str) -> bool:
     """
     Return True if URL's host is on the allowlist.
     Requires https (or http only for explicitly listed legacy domains).
     """
-    host = _normalize_host(url)
-    if not host:
+    # Reject other schemes without parsing
+    if not url[:8].lower().startswith(("http://", "https://")):
         return False
-
     try:
         parsed = urlparse(url)
-        scheme = (parsed.scheme or "").lower()
     except Exception:
         return False
+    return is_allowed_parsed(parsed)
+
 
+def is_allowed_parsed(parsed: ParseResult) -> bool:
+    """Same as is_allowed, for callers that already hold a parsed URL."""
+    scheme = (parsed.scheme or "").lower()
     if scheme not in ("http", "https"):
         return False
 
-    domains = _get_domains()
-    for pattern in domains:
-        if _host_matches_pattern(host, pattern):
-            return True
-    return False
+    host = _normalize_host(parsed)
+    if not host:
+        return False
+
+    return _host_is_allowed(host)
 
 
 def reset_cache() -> None:
-    """Clear cached allowlist (for tests)."""
-    global _cached_domains
+    """Clear cached allowlist, compiled matcher, and per-host results (for tests)."""
+    global _cached_domains, _matcher
     _cached_domains = None
+    _matcher = None
+    _host_is_allowed.cache_clear()
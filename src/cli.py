@@ -11,6 +11,7 @@ from .fetch import (
     FetchError,
     URLBlockedError,
     fetch,
+    start_extract_pool,
 )
 
 
@@ -33,12 +34,18 @@ def main() -> None:
         default=8877,
         help="Port for --serve (default: 8877)",
     )
+    fetch_parser.add_argument(
+        "--threads",
+        type=int,
+        default=8,
+        help="Worker threads for --serve (default: 8)",
+    )
 
     args = parser.parse_args()
 
     if args.command == "fetch":
         if args.serve:
-            _serve(args.port)
+            _serve(args.port, args.threads)
         else:
             _run_fetch(args.url)
 
@@ -61,7 +68,7 @@ def _run_fetch(url: str) -> None:
         sys.exit(1)
 
 
-def _serve(port: int) -> None:
+def _serve(port: int, threads: int = 8) -> None:
     from flask import Flask, request
 
     app = Flask(__name__)
@@ -83,8 +90,17 @@ def _serve(port: int) -> None:
             # Detailed error already logged by fetch module
             return {"error": "Fetch failed"}, 502
 
+    start_extract_pool()
     print(f"[steenbok] fetch server at http://127.0.0.1:{port}/fetch?url=...")
-    app.run(host="127.0.0.1", port=port, debug=False)
+    # fetch() is blocking but thread-safe (shared client, per-host rate limit),
+    # so a thread pool serves distinct hosts concurrently. One process keeps
+    # rate-limit state shared across all requests.
+    try:
+        from waitress import serve
+    except ImportError:
+        app.run(host="127.0.0.1", port=port, debug=False, threaded=True)
+    else:
+        serve(app, host="127.0.0.1", port=port, threads=threads)
 
 
 if __name__ == "__main__":
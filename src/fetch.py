@@ -3,52 +3,211 @@ Safe URL fetcher: allowlist, HTTP limits, text extraction.
 For research use — Michelson/Feynman follow-up on search results.
 """
 
+import atexit
+import codecs
+import importlib.util
 import ipaddress
 import logging
+import logging.handlers
+import multiprocessing
 import os
+import queue
 import re
 import socket
 import threading
 import time
-from urllib.parse import urljoin, urlparse
-
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from html import unescape
+from urllib.parse import ParseResult, urljoin, urlparse
+from urllib.request import getproxies
+
+import httpcore
 import httpx
 import trafilatura
 
 from . import allowlist
 
-# Audit logger: ISO 8601 timestamp on every entry
+# Audit logger: ISO 8601 timestamp on every entry. Records are queued and
+# written to stderr by a listener thread, so a slow stderr never blocks fetch().
+# The listener is started by _get_client(), not at import, so extraction pool
+# workers (which import this module but never fetch) do not start one.
 _LOG = logging.getLogger("steenbok.fetch")
-if not _LOG.handlers:
-    _handler = logging.StreamHandler()
-    _handler.setFormatter(
+
+
+def _start_audit_log() -> None:
+    """Attach the queued stderr handler to _LOG unless it already has one."""
+    if _LOG.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(
         logging.Formatter(
             fmt="%(asctime)s.%(msecs)03dZ [steenbok] %(message)s",
             datefmt="%Y-%m-%dT%H:%M:%S",
         )
     )
-    _handler.formatter.converter = time.gmtime
-    _LOG.addHandler(_handler)
+    handler.formatter.converter = time.gmtime
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _LOG.addHandler(logging.handlers.QueueHandler(log_queue))
     _LOG.setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)  # Flushes queued records
 
 
 # Limits
 TIMEOUT_SEC = 10
+# Per page, when extraction runs in the process pool. Counts time queued for a
+# worker too. A timed-out extraction cannot be cancelled once started and keeps
+# its worker busy until it finishes, so a few pathological pages can occupy
+# every worker and make later requests time out in the queue.
+EXTRACT_TIMEOUT_SEC = 30
 MAX_RESPONSE_BYTES = 5 * 1024 * 1024  # 5 MB
 MAX_PDF_BYTES = 2 * 1024 * 1024  # 2 MB — stricter cap before PyMuPDF parsing
+MAX_PDF_PAGES = 200  # Later pages are not extracted
+MAX_COMPRESSED_BYTES = 2 * 1024 * 1024  # 2 MB on the wire, for encoded bodies
+MAX_COMPRESSION_RATIO = 100  # Decompressed/wire; higher looks like a zip bomb
 MAX_REDIRECTS = 3
-DRAIN_INTERVAL_SEC = 5.0
+MAX_URL_LENGTH = 2048
+CHARSET_SNIFF_BYTES = 8192  # Sample size for charset detection
+DRAIN_INTERVAL_SEC = 5.0  # Per host
+RATE_LIMIT_PRUNE_SEC = 60.0  # Forget hosts idle this long
+DNS_CACHE_TTL_SEC = 15 * 60  # 15 min
+DNS_CACHE_PRUNE_SEC = 60.0  # How often expired entries are dropped
 
 USER_AGENT = (
     "Steenbok-fetcher/1.0 (research; +https://github.com/SCantley/steenbok)"
 )
 
+# Only encodings _read_encoded_body can decompress with a bounded output size
+ACCEPT_ENCODING = "gzip, deflate"
+
 # Block these schemes
 BLOCKED_SCHEMES = frozenset({"file", "data", "javascript", "vbscript", "ftp"})
 
 # Hostnames to block without DNS resolution
 BLOCKED_HOSTNAMES = frozenset({"localhost", "localhost.localdomain"})
 
+# Non-public IPv4 ranges as (network, netmask) ints for the integer fast path.
+# Superset of ipaddress's private/loopback/link-local/reserved/unspecified,
+# plus CGNAT shared space, which is_private does not cover.
+_BLOCKED_V4_RANGES = tuple(
+    (int(net.network_address), int(net.netmask))
+    for net in map(
+        ipaddress.IPv4Network,
+        (
+            "0.0.0.0/8",
+            "10.0.0.0/8",
+            "100.64.0.0/10",
+            "127.0.0.0/8",
+            "169.254.0.0/16",
+            "172.16.0.0/12",
+            "192.0.0.0/24",
+            "192.0.2.0/24",
+            "192.168.0.0/16",
+            "198.18.0.0/15",
+            "198.51.100.0/24",
+            "203.0.113.0/24",
+            "240.0.0.0/4",  # Includes 255.255.255.255
+        ),
+    )
+)
+
+# Content-Type rules (Risk 5), matched against the lowercased header value
+_BLOCKED_CT_RE = re.compile(
+    r"application/(?:msword|vnd\.ms-|vnd\.openxmlformats-officedocument|rtf"
+    r"|zip|x-rar|x-7z|javascript|x-msdownload)|image/svg\+xml"
+)
+_PDF_CT_RE = re.compile(r"application/pdf")
+_TEXT_CT_RE = re.compile(r"text/html|text/plain|application/xhtml\+xml")
+_STREAMING_CT_RE = re.compile(r"text/event-stream|multipart/x-mixed-replace")
+_CHARSET_RE = re.compile(r"charset=\s*[\"']?([\w.:-]+)")
+_META_CHARSET_RE = re.compile(
+    rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE
+)
+# Codecs a declared charset may select, keyed by codecs.lookup() name and
+# mapped to the decoder WHATWG uses for them. Other Python codecs (idna,
+# punycode, rot-13, ...) are not text encodings and are ignored.
+_DECLARED_ENCODINGS = {
+    "utf-8": "utf-8",
+    "utf-16": "utf-16",
+    "utf-16-le": "utf-16-le",
+    "utf-16-be": "utf-16-be",
+    "ascii": "cp1252",
+    "iso8859-1": "cp1252",
+    "iso8859-2": "iso8859-2",
+    "iso8859-3": "iso8859-3",
+    "iso8859-4": "iso8859-4",
+    "iso8859-5": "iso8859-5",
+    "iso8859-6": "iso8859-6",
+    "iso8859-7": "iso8859-7",
+    "iso8859-8": "iso8859-8",
+    "iso8859-9": "cp1254",
+    "iso8859-10": "iso8859-10",
+    "iso8859-13": "iso8859-13",
+    "iso8859-14": "iso8859-14",
+    "iso8859-15": "iso8859-15",
+    "iso8859-16": "iso8859-16",
+    "koi8-r": "koi8-r",
+    "koi8-u": "koi8-u",
+    "mac-roman": "mac-roman",
+    "mac-cyrillic": "mac-cyrillic",
+    "cp866": "cp866",
+    "cp874": "cp874",
+    "cp1250": "cp1250",
+    "cp1251": "cp1251",
+    "cp1252": "cp1252",
+    "cp1253": "cp1253",
+    "cp1254": "cp1254",
+    "cp1255": "cp1255",
+    "cp1256": "cp1256",
+    "cp1257": "cp1257",
+    "cp1258": "cp1258",
+    "gb2312": "gbk",
+    "gbk": "gbk",
+    "gb18030": "gb18030",
+    "big5": "big5hkscs",
+    "big5hkscs": "big5hkscs",
+    "euc_jp": "euc_jp",
+    "iso2022_jp": "iso2022_jp",
+    "shift_jis": "cp932",
+    "cp932": "cp932",
+    "euc_kr": "cp949",
+    "cp949": "cp949",
+}
+# charset_normalizer results trusted for undeclared text; see _guess_legacy_encoding
+_MULTIBYTE_ENCODINGS = frozenset(
+    {
+        "big5",
+        "big5hkscs",
+        "cp932",
+        "cp949",
+        "cp950",
+        "euc_jis_2004",
+        "euc_jp",
+        "euc_kr",
+        "gb18030",
+        "gb2312",
+        "gbk",
+        "hz",
+        "iso2022_jp",
+        "iso2022_kr",
+        "johab",
+        "shift_jis",
+        "shift_jis_2004",
+        "utf_16",
+        "utf_32",
+    }
+)
+
+# Regex HTML stripper, last-resort fallback when selectolax is not installed
+_SCRIPT_RE = re.compile(r"<script[^>]*>.*?</script>", re.DOTALL | re.IGNORECASE)
+_STYLE_RE = re.compile(r"<style[^>]*>.*?</style>", re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
+
 
 class FetchError(Exception):
     """Base for fetch failures."""
@@ -77,14 +236,34 @@ class ExtractionError(FetchError):
 def _is_blocked_ip(ip_str: str) -> bool:
     """
     Return True if the given IP (string) is private, loopback, link-local,
-    reserved, or unspecified. Uses ipaddress module for full coverage
-    (0.0.0.0, 169.254.x.x, IPv6 private/link-local, IPv4-mapped IPv6).
+    reserved, unspecified, or CGNAT. Dotted-quad IPv4 is checked with integer
+    masks; IPv6 goes through the ipaddress module (private/link-local,
+    IPv4-mapped IPv6).
     Returns False for non-IP strings (hostnames) — they are validated by allowlist.
     """
+    ip_str = ip_str.strip()
     try:
-        addr = ipaddress.ip_address(ip_str.strip())
+        packed = socket.inet_pton(socket.AF_INET, ip_str)
+    except OSError:
+        return _is_blocked_ip_slow(ip_str)
+    return _is_blocked_v4(int.from_bytes(packed, "big"))
+
+
+def _is_blocked_v4(ip: int) -> bool:
+    return any(ip & mask == net for net, mask in _BLOCKED_V4_RANGES)
+
+
+def _is_blocked_ip_slow(ip_str: str) -> bool:
+    """_is_blocked_ip for anything that is not a strict dotted-quad IPv4."""
+    # Hostnames have no ":" and are not all digits/dots; skip the ValueError path
+    if ":" not in ip_str and not ip_str.replace(".", "").isdigit():
+        return False
+    try:
+        addr = ipaddress.ip_address(ip_str)
     except ValueError:
         return False  # Not an IP (e.g. domain name); allowlist will validate
+    if addr.version == 6 and addr.ipv4_mapped is not None:
+        return _is_blocked_v4(int(addr.ipv4_mapped))  # ::ffff:a.b.c.d
     return (
         addr.is_private
         or addr.is_loopback
@@ -107,10 +286,31 @@ def _is_blocked_host(host: str) -> bool:
     return _is_blocked_ip(host_lower)
 
 
-def _validate_url(url: str) -> None:
-    """Raise URLBlockedError if URL is dangerous."""
+def _validate_url(url: str) -> ParseResult:
+    """
+    Raise URLBlockedError if URL is dangerous. Returns the parsed URL.
+    Cheap checks (length, scheme prefix) run before parsing.
+    """
+    if len(url) > MAX_URL_LENGTH:
+        raise URLBlockedError("URL too long")
+
+    if not url[:8].lower().startswith(("http://", "https://")):
+        scheme = url.partition(":")[0].lower() if ":" in url else ""
+        if scheme in BLOCKED_SCHEMES:
+            raise URLBlockedError(f"Blocked scheme: {scheme}")
+        raise URLBlockedError(f"Unsupported scheme: {scheme}")
+
     try:
         parsed = urlparse(url)
+    except Exception as e:
+        raise URLBlockedError(f"Invalid URL: {e}") from e
+    _validate_parsed(parsed)
+    return parsed
+
+
+def _validate_parsed(parsed: ParseResult) -> None:
+    """Raise URLBlockedError if the already-parsed URL is dangerous."""
+    try:
         scheme = (parsed.scheme or "").lower()
         host = (parsed.hostname or "").lower()
     except Exception as e:
@@ -128,35 +328,106 @@ def _validate_url(url: str) -> None:
     if _is_blocked_host(host):
         raise URLBlockedError(f"Blocked host: {host}")
 
-    if len(url) > 2048:
-        raise URLBlockedError("URL too long")
 
+_dns_cache: dict[str, tuple[float, list[str]]] = {}
+_dns_last_prune: float = 0
+_dns_cache_lock = threading.Lock()
 
-def _resolve_and_validate_host(host: str) -> None:
+
+def _resolve_host(host: str) -> list[str]:
+    """
+    Resolve host to unique IP strings (in resolver order), cached for
+    DNS_CACHE_TTL_SEC. Expired entries are pruned at most once a minute.
+    Raises socket.gaierror on resolution failure (failures are not cached).
+    """
+    now = time.monotonic()
+    with _dns_cache_lock:
+        cached = _dns_cache.get(host)
+        if cached is not None and now - cached[0] < DNS_CACHE_TTL_SEC:
+            return cached[1]
+
+    # SOCK_STREAM: one entry per address instead of one per socket type
+    ips: list[str] = []
+    seen: set[str] = set()
+    for res in socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM):
+        if res[0] in (socket.AF_INET, socket.AF_INET6):
+            ip_str = res[4][0]
+            if ip_str not in seen:
+                seen.add(ip_str)
+                ips.append(ip_str)
+
+    global _dns_last_prune
+    with _dns_cache_lock:
+        if now - _dns_last_prune >= DNS_CACHE_PRUNE_SEC:
+            for h, (ts, _) in list(_dns_cache.items()):
+                if now - ts >= DNS_CACHE_TTL_SEC:
+                    del _dns_cache[h]
+            _dns_last_prune = now
+        _dns_cache[host] = (now, ips)
+    return ips
+
+
+def _resolve_and_validate_host(host: str) -> list[str]:
     """
     Resolve host to IPs and raise URLBlockedError if any resolve to private/local.
     Used for both initial fetch and redirect targets to prevent DNS rebinding.
+    Resolved IPs are cached, but every cached IP is re-checked on each call.
+    Returns the validated IPs; _PinnedBackend connects only to these.
     """
     if not host:
         raise URLBlockedError("Host has no hostname")
 
     try:
-        for res in socket.getaddrinfo(host, None, socket.AF_UNSPEC):
-            sockaddr = res[4]
-            if res[0] == socket.AF_INET:
-                ip_str = sockaddr[0]
-            elif res[0] == socket.AF_INET6:
-                ip_str = sockaddr[0]
-            else:
-                continue
-            if _is_blocked_ip(ip_str):
-                raise URLBlockedError(f"Resolves to blocked IP: {ip_str}")
+        ips = _resolve_host(host)
     except socket.gaierror as e:
         raise URLBlockedError(f"Host unreachable: {host}") from e
 
+    for ip_str in ips:
+        if _is_blocked_ip(ip_str):
+            raise URLBlockedError(f"Resolves to blocked IP: {ip_str}")
+
     if _is_blocked_host(host):
         raise URLBlockedError(f"Blocked host: {host}")
 
+    return ips
+
+
+class _PinnedBackend(httpcore.SyncBackend):
+    """
+    Network backend that connects to the IPs _resolve_and_validate_host
+    approved, instead of letting the socket layer resolve the host again.
+    Closes the rebinding window between validation and connect. TLS SNI and
+    certificate checks still use the original hostname.
+    """
+
+    def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: float | None = None,
+        local_address: str | None = None,
+        socket_options=None,
+    ) -> httpcore.NetworkStream:
+        error: Exception = httpcore.ConnectError(f"No addresses for host: {host}")
+        for ip_str in _resolve_and_validate_host(host):
+            try:
+                return super().connect_tcp(
+                    ip_str, port, timeout, local_address, socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e  # Try the next address, like socket.create_connection
+        raise error
+
+
+class _PinnedTransport(httpx.HTTPTransport):
+    """HTTPTransport whose connection pool dials through _PinnedBackend."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        # httpx does not expose network_backend; set it on the httpcore pool.
+        # This is a private attribute, so httpcore is pinned in requirements.txt
+        self._pool._network_backend = _PinnedBackend()
+
 
 def _validate_redirect_target(redirect_url: str, current_url: str) -> None:
     """
@@ -171,32 +442,83 @@ def _validate_redirect_target(redirect_url: str, current_url: str) -> None:
     _resolve_and_validate_host(host)
 
     # Allowlist: redirect target must be on allowlist
-    if not allowlist.is_allowed(redirect_url):
+    if not allowlist.is_allowed_parsed(parsed):
         raise AllowlistError(f"Redirect target not on allowlist: {redirect_url}")
 
 
-_last_fetch_time: float = 0
+# Shared client: keepalive (and HTTP/2 when h2 is installed) amortizes TCP+TLS
+# setup across fetches. Redirects are followed manually in _do_fetch.
+# Passing transport= means httpx ignores HTTP(S)_PROXY/ALL_PROXY/NO_PROXY. That
+# is deliberate: a proxy resolves the host itself, which would bypass the
+# validated-IP pinning above and let DNS rebinding reach internal addresses.
+_CLIENT: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+
+def _new_client() -> httpx.Client:
+    _start_audit_log()
+    if any(k in ("http", "https", "all") for k in getproxies()):
+        _LOG.warning("reason=proxy_env_ignored detail=fetches connect directly")
+    client = httpx.Client(
+        timeout=TIMEOUT_SEC,
+        follow_redirects=False,
+        headers={"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING},
+        transport=_PinnedTransport(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+        ),
+    )
+    atexit.register(client.close)
+    return client
+
+
+def _get_client() -> httpx.Client:
+    """
+    Return the shared client, creating it (and starting the audit log) on
+    first use so that pool workers, which only import this module, stay idle.
+    """
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+    with _client_lock:
+        if _CLIENT is None:
+            _CLIENT = _new_client()
+    return _CLIENT
+
+
+_last_fetch: dict[str, float] = {}
+_last_prune: float = 0
 _rate_limit_lock = threading.Lock()
 
 
-def _rate_limit() -> None:
-    """Enforce ~5 seconds between fetches. Thread-safe for multi-threaded WSGI.
+def _rate_limit(host: str) -> None:
+    """Enforce ~5 seconds between fetches to the same host. Thread-safe for
+    multi-threaded WSGI; distinct hosts do not wait on each other.
     Lock released before sleep so concurrent requests do not queue for full duration.
     """
-    global _last_fetch_time
+    global _last_prune
     while True:
         with _rate_limit_lock:
             now = time.monotonic()
-            elapsed = now - _last_fetch_time
-            if elapsed >= DRAIN_INTERVAL_SEC or _last_fetch_time == 0:
-                _last_fetch_time = time.monotonic()
+            if now - _last_prune >= RATE_LIMIT_PRUNE_SEC:
+                for h, t in list(_last_fetch.items()):
+                    if now - t >= RATE_LIMIT_PRUNE_SEC:
+                        del _last_fetch[h]
+                _last_prune = now
+            last = _last_fetch.get(host)
+            elapsed = now - last if last is not None else DRAIN_INTERVAL_SEC
+            if elapsed >= DRAIN_INTERVAL_SEC:
+                _last_fetch[host] = now
                 return
             sleep_time = DRAIN_INTERVAL_SEC - elapsed
         time.sleep(sleep_time)
 
 
-def _extract_text_pdf(pdf_bytes: bytes) -> str:
-    """Extract text from PDF using PyMuPDF. Returns empty string if no text."""
+def _extract_text_pdf(pdf_bytes: bytes | bytearray) -> str:
+    """
+    Extract plain text from the first MAX_PDF_PAGES pages using PyMuPDF.
+    Returns empty string if no text.
+    """
     if len(pdf_bytes) > MAX_PDF_BYTES:
         raise ExtractionError("PDF exceeds maximum size")
 
@@ -205,14 +527,64 @@ def _extract_text_pdf(pdf_bytes: bytes) -> str:
     try:
         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
         try:
-            text = "".join(page.get_text() for page in doc)
-            return text.strip() if text.strip() else ""
+            # Plain text mode; no image blocks, no whitespace preservation
+            flags = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_WHITESPACE
+            pages = doc.pages(0, min(doc.page_count, MAX_PDF_PAGES))
+            return "".join(page.get_text("text", flags=flags) for page in pages).strip()
         finally:
             doc.close()
     except Exception:
         raise ExtractionError("PDF could not be read (corrupted, encrypted, or unsupported)")
 
 
+def _decode_text(content: bytes | bytearray, content_type: str) -> str:
+    """
+    Decode a text response. Uses the Content-Type charset, then a <meta>
+    charset in the first CHARSET_SNIFF_BYTES; otherwise UTF-8, unless more
+    than 1% of the result is replacement characters, in which case the page
+    is treated as unlabeled legacy text (see _guess_legacy_encoding).
+    """
+    m = _CHARSET_RE.search(content_type)
+    encoding = _declared_encoding(m.group(1)) if m else None
+    if encoding is None:
+        m = _META_CHARSET_RE.search(content[:CHARSET_SNIFF_BYTES])
+        encoding = _declared_encoding(m.group(1).decode("ascii")) if m else None
+        if encoding is not None and encoding.startswith("utf-16"):
+            encoding = "utf-8"  # A <meta> readable as ASCII cannot be UTF-16
+    if encoding is not None:
+        return content.decode(encoding, errors="replace")
+
+    text = content.decode("utf-8", errors="replace")
+    if text.count("\ufffd") * 100 <= len(text):
+        return text
+    return content.decode(_guess_legacy_encoding(content), errors="replace")
+
+
+def _declared_encoding(label: str) -> str | None:
+    """Decoder for a declared charset label; None unless in _DECLARED_ENCODINGS."""
+    try:
+        name = codecs.lookup(label.strip()).name
+    except LookupError:
+        return None
+    return _DECLARED_ENCODINGS.get(name)
+
+
+def _guess_legacy_encoding(content: bytes | bytearray) -> str:
+    """
+    Charset for undeclared, non-UTF-8 text: a detected multibyte encoding
+    (CJK, UTF-16/32), else cp1252, the WHATWG default. Single-byte guesses
+    from a small sample are not trusted; latin-1 French reads as cp1250/cp775.
+    """
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return "cp1252"
+    best = from_bytes(content[:CHARSET_SNIFF_BYTES]).best()
+    if best is not None and best.encoding in _MULTIBYTE_ENCODINGS:
+        return best.encoding
+    return "cp1252"
+
+
 def _extract_text(html: str, url: str) -> str:
     """Extract main text using trafilatura. Fallback to simple strip."""
     result = trafilatura.extract(
@@ -225,21 +597,169 @@ def _extract_text(html: str, url: str) -> str:
     if result and result.strip():
         return result.strip()
 
-    # Fallback: strip tags crudely
-    from html import unescape
-
-    import re
-    text = re.sub(r"<script[^>]*>.*?</script>", "", html, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r"<style[^>]*>.*?</style>", "", text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r"<[^>]+>", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    text = unescape(text).strip()
+    # Fallback: strip tags with selectolax, or crudely with regex if missing
+    try:
+        text = _strip_html(html)
+    except ImportError:
+        text = _strip_html_regex(html)
     return text if text else ""
 
 
+def _strip_html(html: str) -> str:
+    """Strip tags in one pass with selectolax (C parser). Raises ImportError if absent."""
+    from selectolax.parser import HTMLParser
+
+    tree = HTMLParser(html)
+    for tag in ("script", "style", "noscript"):
+        for node in tree.css(tag):
+            node.decompose()
+    text = tree.text(separator=" ", strip=True)
+    return _WS_RE.sub(" ", text).strip()
+
+
+def _strip_html_regex(html: str) -> str:
+    """Strip tags crudely with regex. Backstop when selectolax is not installed."""
+    text = _SCRIPT_RE.sub("", html)
+    text = _STYLE_RE.sub("", text)
+    text = _TAG_RE.sub(" ", text)
+    text = _WS_RE.sub(" ", text)
+    return unescape(text).strip()
+
+
+_EXTRACT_POOL: ProcessPoolExecutor | None = None
+_extract_pool_workers: int | None = None
+_extract_pool_lock = threading.Lock()
+
+
+def _new_extract_pool() -> ProcessPoolExecutor:
+    # Spawn, not fork: the server process already runs threads
+    return ProcessPoolExecutor(
+        max_workers=_extract_pool_workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def start_extract_pool(max_workers: int | None = None) -> None:
+    """
+    Run text extraction (trafilatura, PyMuPDF) in worker processes so CPU-bound
+    parsing does not serialize concurrent fetches. Meant for --serve; a single
+    CLI fetch is faster without process startup.
+    """
+    global _EXTRACT_POOL, _extract_pool_workers
+    with _extract_pool_lock:
+        if _EXTRACT_POOL is None:
+            _extract_pool_workers = max_workers
+            _EXTRACT_POOL = _new_extract_pool()
+            atexit.register(_shutdown_extract_pool)
+
+
+def _shutdown_extract_pool() -> None:
+    with _extract_pool_lock:
+        if _EXTRACT_POOL is not None:
+            _EXTRACT_POOL.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_extract(func, *args) -> str:
+    """Call an extractor in the pool if started, else inline."""
+    global _EXTRACT_POOL
+    pool = _EXTRACT_POOL
+    if pool is None:
+        return func(*args)
+    try:
+        future = pool.submit(func, *args)
+        return future.result(timeout=EXTRACT_TIMEOUT_SEC)
+    except FutureTimeoutError:
+        future.cancel()
+        raise ExtractionError("Text extraction timed out")
+    except BrokenProcessPool as e:
+        # A crashed worker breaks the whole pool; replace it for later requests
+        with _extract_pool_lock:
+            if _EXTRACT_POOL is pool:
+                _EXTRACT_POOL = _new_extract_pool()
+        raise ExtractionError("Text extraction worker crashed") from e
+
+
+def _content_length(response: httpx.Response) -> int | None:
+    """Declared Content-Length, or None if missing or malformed."""
+    try:
+        length = int(response.headers.get("content-length", ""))
+    except ValueError:
+        return None
+    return length if length >= 0 else None
+
+
+def _read_body(response: httpx.Response) -> bytearray:
+    """
+    Stream the body, stopping at MAX_RESPONSE_BYTES (Risk 4). With a plain
+    Content-Length the buffer is allocated once at that size; otherwise it
+    grows as chunks arrive. Returned without a final copy to bytes.
+    """
+    encoding = response.headers.get("content-encoding", "identity").strip().lower()
+    if encoding not in ("", "identity"):
+        return _read_encoded_body(response, encoding)
+
+    size = _content_length(response)
+    buf = bytearray(min(size, MAX_RESPONSE_BYTES)) if size is not None else bytearray()
+    off = 0
+    for chunk in response.iter_bytes():
+        if size is not None:
+            n = min(len(chunk), len(buf) - off)
+            buf[off : off + n] = memoryview(chunk)[:n]
+        else:
+            n = min(len(chunk), MAX_RESPONSE_BYTES - off)
+            buf += memoryview(chunk)[:n]
+        off += n
+        if off >= MAX_RESPONSE_BYTES:
+            response.close()  # Drop the connection; do not drain the rest
+            break
+    del buf[off:]  # Body shorter than declared; shrinks in place
+    return buf
+
+
+def _read_encoded_body(response: httpx.Response, encoding: str) -> bytearray:
+    """
+    Decompress a gzip/deflate body from raw chunks with zlib max_length, so
+    memory stays bounded by MAX_RESPONSE_BYTES however far one raw read would
+    inflate. Stops after MAX_COMPRESSED_BYTES on the wire; raises FetchError on
+    a zip-bomb compression ratio.
+    """
+    if encoding not in ("gzip", "x-gzip", "deflate"):
+        raise FetchError(f"Unsupported content encoding: {encoding}")
+    decomp = zlib.decompressobj(32 + zlib.MAX_WBITS)  # Accepts gzip or zlib header
+    raw_fallback = encoding == "deflate"
+    buf = bytearray()
+    wire = 0
+    try:
+        for data in response.iter_raw():
+            while data and len(buf) < MAX_RESPONSE_BYTES:
+                consumed = len(data)
+                try:
+                    buf += decomp.decompress(data, MAX_RESPONSE_BYTES - len(buf))
+                except zlib.error:
+                    # Some servers send "deflate" without the zlib header; retry raw once
+                    if not raw_fallback or wire:
+                        raise
+                    raw_fallback = False
+                    decomp = zlib.decompressobj(-zlib.MAX_WBITS)
+                    continue
+                data = decomp.unconsumed_tail
+                wire += consumed - len(data)
+                # Ratio only checked past 1 MB; tiny pages compress very well
+                if len(buf) > 1024 * 1024 and len(buf) > wire * MAX_COMPRESSION_RATIO:
+                    raise FetchError("Suspicious compression ratio")
+            if decomp.eof:
+                break
+            if len(buf) >= MAX_RESPONSE_BYTES or wire >= MAX_COMPRESSED_BYTES:
+                response.close()  # Drop the connection; do not drain the rest
+                break
+    except zlib.error as e:
+        raise FetchError(f"Could not decode {encoding} response body") from e
+    return buf
+
+
 def _do_fetch(
     client: httpx.Client, url: str
-) -> tuple[httpx.Response, bytes]:
+) -> tuple[httpx.Response, bytearray]:
     """
     Perform GET with manual redirect handling. Validates each redirect target
     against allowlist and IP blocklist. Streams body, stopping at MAX_RESPONSE_BYTES.
@@ -253,9 +773,8 @@ def _do_fetch(
             "GET", current_url, follow_redirects=False
         ) as response:
             if 300 <= response.status_code < 400:
-                # Drain redirect response body before reconnecting
-                for _ in response.iter_bytes():
-                    pass
+                # Drop the redirect body unread; draining it could inflate without bound
+                response.close()
                 redirect_count += 1
                 if redirect_count > MAX_REDIRECTS:
                     raise FetchError(f"Too many redirects: {url}")
@@ -269,13 +788,11 @@ def _do_fetch(
 
             response.raise_for_status()
 
-            # Stream and enforce size limit (Risk 4)
-            content = bytearray()
-            for chunk in response.iter_bytes():
-                content.extend(chunk)
-                if len(content) > MAX_RESPONSE_BYTES:
-                    break
-            return response, bytes(content)
+            # Never-ending streams would only be read up to the cap; refuse early
+            if _STREAMING_CT_RE.search(response.headers.get("content-type", "").lower()):
+                raise FetchError("Streaming responses not supported")
+
+            return response, _read_body(response)
 
     raise FetchError(f"Too many redirects: {url}")  # Unreachable
 
@@ -286,67 +803,41 @@ def fetch(url: str) -> str:
     Raises AllowlistError, URLBlockedError, or FetchError on failure.
     """
     start_time = time.monotonic()
+    client = _get_client()
 
     try:
-        _validate_url(url)
+        parsed = _validate_url(url)
     except URLBlockedError as e:
         _LOG.info("reason=url_blocked url=%s error=%s", url, e)
         raise
 
-    if not allowlist.is_allowed(url):
+    if not allowlist.is_allowed_parsed(parsed):
         _LOG.info("reason=allowlist_violation url=%s", url)
         raise AllowlistError(f"URL not on allowlist: {url}")
 
     # DNS rebinding protection: resolve initial host before first HTTP request
-    parsed = urlparse(url)
     host = (parsed.hostname or "").lower()
     if host:
         _resolve_and_validate_host(host)
 
-    _rate_limit()
+    _rate_limit(host)
 
     try:
-        with httpx.Client(
-            timeout=TIMEOUT_SEC,
-            follow_redirects=False,
-            headers={"User-Agent": USER_AGENT},
-        ) as client:
-            response, content = _do_fetch(client, url)
-            elapsed = time.monotonic() - start_time
-
-            # Content-Type validation (Risk 5)
-            content_type = (response.headers.get("content-type") or "").lower()
-            if "application/msword" in content_type:
-                raise FetchError(f"Blocked content type: {content_type}")
-            if "application/vnd.ms-" in content_type:
-                raise FetchError(f"Blocked content type: {content_type}")
-            if "application/vnd.openxmlformats-officedocument" in content_type:
-                raise FetchError(f"Blocked content type: {content_type}")
-            if "application/rtf" in content_type:
-                raise FetchError(f"Blocked content type: {content_type}")
-            if any(
-                x in content_type
-                for x in ("application/zip", "application/x-rar", "application/x-7z")
-            ):
-                raise FetchError(f"Blocked content type: {content_type}")
-            if "image/svg+xml" in content_type:
-                raise FetchError(f"Blocked content type: {content_type}")
-            if "application/javascript" in content_type:
-                raise FetchError(f"Blocked content type: {content_type}")
-            if "application/x-msdownload" in content_type:
-                raise FetchError(f"Blocked content type: {content_type}")
-
-            if "application/pdf" in content_type:
-                text = _extract_text_pdf(content)
-            elif (
-                "text/html" in content_type
-                or "text/plain" in content_type
-                or "application/xhtml+xml" in content_type
-            ):
-                html = content.decode("utf-8", errors="replace")
-                text = _extract_text(html, url)
-            else:
-                raise FetchError(f"Unsupported content type: {content_type}")
+        response, content = _do_fetch(client, url)
+        elapsed = time.monotonic() - start_time
+
+        # Content-Type validation (Risk 5)
+        content_type = (response.headers.get("content-type") or "").lower()
+        if _BLOCKED_CT_RE.search(content_type):
+            raise FetchError(f"Blocked content type: {content_type}")
+
+        if _PDF_CT_RE.search(content_type):
+            text = _run_extract(_extract_text_pdf, content)
+        elif _TEXT_CT_RE.search(content_type):
+            html = _decode_text(content, content_type)
+            text = _run_extract(_extract_text, html, url)
+        else:
+            raise FetchError(f"Unsupported content type: {content_type}")
 
         if not text:
             raise ExtractionError(f"No extractable text: {url}")
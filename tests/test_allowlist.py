@@ -51,3 +51,9 @@ def test_denies_invalid_url():
     assert not allowlist.is_allowed("not-a-url")
     assert not allowlist.is_allowed("")
 
+
+def test_wildcard_requires_subdomain():
+    allowlist.reset_cache()
+    assert allowlist.is_allowed("https://www.cs.stanford.edu/page")
+    assert not allowlist.is_allowed("https://edu/page")
+    assert not allowlist.is_allowed("https://wikipedia.org.evil.com/page")
@@ -1,17 +1,33 @@
 """Tests for fetch module (IP blocking, validation)."""
 
+import gzip
+import importlib
+import socket
+import time
+import zlib
+
+import httpx
 import pytest
 
 from src.fetch import (
+    _BLOCKED_CT_RE,
     AllowlistError,
     ExtractionError,
     FetchError,
     URLBlockedError,
+    _PinnedBackend,
+    _decode_text,
     _is_blocked_host,
     _is_blocked_ip,
+    _resolve_and_validate_host,
+    _strip_html_regex,
+    _validate_url,
     fetch,
 )
 
+# src re-exports the fetch() function as src.fetch, so get the module explicitly
+fetch_mod = importlib.import_module("src.fetch")
+
 
 def test_blocked_ip_169_254():
     """Link-local (cloud metadata) must be blocked."""
@@ -37,6 +53,39 @@ def test_blocked_ip_loopback():
     assert _is_blocked_ip("::1") is True
 
 
+def test_blocked_ip_cgnat_and_mapped():
+    """CGNAT and IPv4-mapped IPv6 forms of blocked addresses must be blocked."""
+    assert _is_blocked_ip("100.64.0.1") is True
+    assert _is_blocked_ip("::ffff:169.254.169.254") is True
+    assert _is_blocked_ip("::ffff:8.8.8.8") is False
+
+
+def test_blocked_ip_fast_path_covers_ipaddress():
+    """The IPv4 integer fast path blocks everything ipaddress considers non-public."""
+    import ipaddress
+    import random
+
+    rng = random.Random(0)
+    samples = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(20000)]
+    samples += ["192.0.0.9", "198.19.255.255", "203.0.113.7", "255.255.255.255"]
+    for ip_str in samples:
+        addr = ipaddress.IPv4Address(ip_str)
+        slow = (
+            addr.is_private
+            or addr.is_loopback
+            or addr.is_link_local
+            or addr.is_reserved
+            or addr.is_unspecified
+        )
+        if slow:
+            assert _is_blocked_ip(ip_str) is True, ip_str
+
+
+def test_blocked_ip_hostname_not_ip():
+    """Hostnames are not IPs; the allowlist handles them."""
+    assert _is_blocked_ip("en.wikipedia.org") is False
+
+
 def test_blocked_host_localhost():
     """Localhost hostname must be blocked."""
     assert _is_blocked_host("localhost") is True
@@ -67,3 +116,362 @@ def test_fetch_blocked_host():
     """Fetching localhost raises URLBlockedError."""
     with pytest.raises(URLBlockedError, match="Blocked host"):
         fetch("https://127.0.0.1/admin")
+
+
+@pytest.fixture
+def rebind_dns(monkeypatch):
+    """Resolve every host to the cloud metadata IP, with an empty DNS cache.
+    Returns the list of hosts passed to getaddrinfo."""
+    calls = []
+
+    def fake_getaddrinfo(host, *args, **kwargs):
+        calls.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("169.254.169.254", 0))]
+
+    monkeypatch.setattr(fetch_mod, "_dns_cache", {})
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo)
+    return calls
+
+
+def test_resolve_cached_and_revalidated(rebind_dns):
+    """Repeat lookups hit the DNS cache; cached IPs are still checked."""
+    for _ in range(2):
+        with pytest.raises(URLBlockedError, match="blocked IP"):
+            _resolve_and_validate_host("rebind.example.edu")
+    assert rebind_dns == ["rebind.example.edu"]
+
+
+def test_dns_cache_prunes_expired_entries(rebind_dns, monkeypatch):
+    """Expired hosts are dropped from the DNS cache instead of piling up."""
+    monkeypatch.setattr(fetch_mod, "_dns_last_prune", 0)
+    stale = time.monotonic() - fetch_mod.DNS_CACHE_TTL_SEC - 1
+    fetch_mod._dns_cache["old.example.edu"] = (stale, ["8.8.8.8"])
+    with pytest.raises(URLBlockedError):
+        _resolve_and_validate_host("new.example.edu")
+    assert "old.example.edu" not in fetch_mod._dns_cache
+    assert "new.example.edu" in fetch_mod._dns_cache
+
+
+def test_blocked_content_types():
+    """Office, archive, script, and SVG types are blocked; text/PDF are not."""
+    for ct in (
+        "application/msword",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "application/x-7z-compressed",
+        "image/svg+xml; charset=utf-8",
+        "application/javascript",
+    ):
+        assert _BLOCKED_CT_RE.search(ct)
+    for ct in ("text/html; charset=utf-8", "application/pdf", "text/plain"):
+        assert not _BLOCKED_CT_RE.search(ct)
+
+
+def test_strip_html_drops_script_style_noscript():
+    """selectolax path removes script/style/noscript and unescapes entities."""
+    pytest.importorskip("selectolax")
+    html = (
+        "<html><head><style>p {color: red}</style></head>"
+        "<body><script>alert(1)</script><noscript>Enable JS</noscript>"
+        "<p>Steenbok &amp; duiker</p>\n<p>grazers</p></body></html>"
+    )
+    assert fetch_mod._strip_html(html) == "Steenbok & duiker grazers"
+
+
+def test_strip_html_regex_drops_script_and_style():
+    """Regex fallback removes script/style bodies and unescapes entities."""
+    html = (
+        "<html><head><style>p {color: red}</style></head>"
+        "<body><script>alert(1)</script><p>Steenbok &amp; duiker</p></body></html>"
+    )
+    assert _strip_html_regex(html) == "Steenbok & duiker"
+
+
+def test_pinned_backend_refuses_rebound_host(rebind_dns):
+    """Connect-time resolution is validated too; no socket to a blocked IP."""
+    with pytest.raises(URLBlockedError, match="blocked IP"):
+        _PinnedBackend().connect_tcp("rebind.example.edu", 443)
+
+
+def test_shared_client_refuses_rebound_host(rebind_dns, monkeypatch):
+    """The shared client dials through _PinnedBackend, so a host rebound to the
+    metadata IP is refused before any socket is opened."""
+    import httpcore
+
+    dialed = []
+
+    def fake_connect(self, host, *args, **kwargs):
+        dialed.append(host)
+
+    monkeypatch.setattr(httpcore.SyncBackend, "connect_tcp", fake_connect)
+    with pytest.raises(URLBlockedError, match="blocked IP"):
+        fetch_mod._get_client().get("https://rebind.example.edu/")
+    assert dialed == []
+
+
+def test_pinned_backend_tries_next_address_after_timeout(monkeypatch):
+    """A blackholed first address (ConnectTimeout) falls through to the next."""
+    import httpcore
+
+    monkeypatch.setattr(
+        fetch_mod, "_resolve_and_validate_host", lambda host: ["2001:db8::1", "8.8.8.8"]
+    )
+    dialed = []
+
+    def fake_connect(self, host, port, timeout=None, local_address=None, socket_options=None):
+        dialed.append(host)
+        if host == "2001:db8::1":
+            raise httpcore.ConnectTimeout("timed out")
+        return "stream"
+
+    monkeypatch.setattr(httpcore.SyncBackend, "connect_tcp", fake_connect)
+    assert _PinnedBackend().connect_tcp("example.edu", 443) == "stream"
+    assert dialed == ["2001:db8::1", "8.8.8.8"]
+
+
+def test_rate_limit_per_host(monkeypatch):
+    """Only repeat fetches to one host wait; idle hosts are pruned."""
+    clock = [1000.0]
+    slept = []
+
+    def fake_sleep(seconds):
+        slept.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(time, "sleep", fake_sleep)
+    monkeypatch.setattr(fetch_mod, "_last_fetch", {})
+    monkeypatch.setattr(fetch_mod, "_last_prune", clock[0])
+
+    fetch_mod._rate_limit("a.example.edu")
+    fetch_mod._rate_limit("b.example.edu")
+    assert slept == []
+
+    fetch_mod._rate_limit("a.example.edu")
+    assert slept == [fetch_mod.DRAIN_INTERVAL_SEC]
+
+    clock[0] += fetch_mod.RATE_LIMIT_PRUNE_SEC
+    fetch_mod._rate_limit("c.example.edu")
+    assert set(fetch_mod._last_fetch) == {"c.example.edu"}
+    assert slept == [fetch_mod.DRAIN_INTERVAL_SEC]
+
+
+def test_decode_text_uses_header_charset():
+    """Content-Type charset wins; unknown labels fall back to UTF-8."""
+    body = "Caf\u00e9 na\u00efve".encode("latin-1")
+    assert _decode_text(body, "text/html; charset=iso-8859-1") == "Caf\u00e9 na\u00efve"
+    assert _decode_text(b"ok", "text/html; charset=bogus-enc") == "ok"
+    assert _decode_text("\u00e9".encode(), "text/plain") == "\u00e9"
+
+
+def test_decode_text_meta_charset():
+    """Without a header charset, a <meta> charset in the page is used."""
+    body = '<meta charset="iso-8859-1"><p>Caf\u00e9</p>'.encode("latin-1")
+    assert "Caf\u00e9" in _decode_text(body, "text/html")
+    body = (
+        '<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">'
+        "<p>\u65e5\u672c</p>"
+    ).encode("shift_jis")
+    assert "\u65e5\u672c" in _decode_text(body, "text/html")
+
+
+def test_decode_text_ignores_non_text_codecs():
+    """Python-only codecs (idna, punycode, undefined) are not honored as charsets."""
+    body = "Caf\u00e9".encode()
+    for label in ("idna", "punycode", "undefined", "rot13"):
+        assert _decode_text(body, f"text/html; charset={label}") == "Caf\u00e9"
+        meta = f'<meta charset="{label}">'.encode() + body
+        assert _decode_text(meta, "text/html").endswith("Caf\u00e9")
+
+
+def test_decode_text_meta_utf16_read_as_utf8():
+    """A <meta> declaring UTF-16/32 is ASCII-readable, so the page is UTF-8."""
+    for label in ("utf-16", "utf-16le", "utf-32"):
+        body = f'<meta charset="{label}"><p>Caf\u00e9</p>'.encode()
+        assert "Caf\u00e9" in _decode_text(body, "text/html")
+
+
+def test_decode_text_undeclared_legacy_falls_back_to_cp1252():
+    """Undeclared non-UTF-8 Western text decodes as cp1252, not a guessed codepage."""
+    text = "Caf\u00e9 na\u00efve r\u00e9sum\u00e9 \u2014 \u201cquoted\u201d"
+    assert _decode_text(text.encode("cp1252"), "text/html") == text
+
+
+def test_decode_text_undeclared_multibyte_detected():
+    """Undeclared CJK text is detected rather than forced to cp1252."""
+    pytest.importorskip("charset_normalizer")
+    text = "\u65e5\u672c\u8a9e\u306e\u30c6\u30ad\u30b9\u30c8\u3067\u3059\u3002" * 50
+    assert _decode_text(text.encode("shift_jis"), "text/plain") == text
+
+
+def test_validate_url_cheap_rejections():
+    """Length and scheme are rejected before parsing, with specific messages."""
+    with pytest.raises(URLBlockedError, match="too long"):
+        _validate_url("https://en.wikipedia.org/" + "a" * 2048)
+    with pytest.raises(URLBlockedError, match="Blocked scheme: file"):
+        _validate_url("file:///etc/passwd")
+    with pytest.raises(URLBlockedError, match="Unsupported scheme: gopher"):
+        _validate_url("gopher://example.edu/")
+    assert _validate_url("HTTPS://en.wikipedia.org/wiki/Steenbok").hostname == "en.wikipedia.org"
+
+
+def _mock_client(response: httpx.Response) -> httpx.Client:
+    return httpx.Client(transport=httpx.MockTransport(lambda request: response))
+
+
+def test_read_body_sized_from_content_length():
+    """Short bodies come back whole; long ones stop at MAX_RESPONSE_BYTES."""
+    small = httpx.Response(200, headers={"content-type": "text/plain"}, content=b"steenbok")
+    _, content = fetch_mod._do_fetch(_mock_client(small), "https://example.edu/")
+    assert content == b"steenbok"
+
+    big = httpx.Response(
+        200,
+        headers={"content-type": "text/plain"},
+        content=b"x" * (fetch_mod.MAX_RESPONSE_BYTES + 10),
+    )
+    _, content = fetch_mod._do_fetch(_mock_client(big), "https://example.edu/")
+    assert len(content) == fetch_mod.MAX_RESPONSE_BYTES
+
+
+class _EndlessStream(httpx.SyncByteStream):
+    """Yields 64 KB chunks forever; records how many were read and whether closed."""
+
+    def __init__(self):
+        self.chunks = 0
+        self.closed = False
+
+    def __iter__(self):
+        while True:
+            self.chunks += 1
+            yield b"x" * 65536
+
+    def close(self):
+        self.closed = True
+
+
+def test_oversized_body_closed_early():
+    """Reading stops and the stream is closed once MAX_RESPONSE_BYTES arrive."""
+    stream = _EndlessStream()
+    response = httpx.Response(200, headers={"content-type": "text/plain"}, stream=stream)
+    with _mock_client(response).stream("GET", "https://example.edu/") as streamed:
+        content = fetch_mod._read_body(streamed)
+        assert stream.closed  # By _read_body itself, not on leaving the with block
+    assert len(content) == fetch_mod.MAX_RESPONSE_BYTES
+    assert stream.chunks == fetch_mod.MAX_RESPONSE_BYTES // 65536
+
+
+def test_event_stream_refused():
+    """text/event-stream is refused before any of the body is read."""
+    stream = _EndlessStream()
+    response = httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, stream=stream
+    )
+    with pytest.raises(FetchError, match="Streaming responses not supported"):
+        fetch_mod._do_fetch(_mock_client(response), "https://example.edu/")
+    assert stream.chunks == 0
+
+
+def test_gzip_body_decoded():
+    """gzip bodies are decompressed by _read_encoded_body."""
+    response = httpx.Response(
+        200,
+        headers={"content-type": "text/html", "content-encoding": "gzip"},
+        stream=httpx.ByteStream(gzip.compress(b"<p>steenbok</p>")),
+    )
+    _, content = fetch_mod._do_fetch(_mock_client(response), "https://example.edu/")
+    assert content == b"<p>steenbok</p>"
+
+
+def test_raw_deflate_body_decoded():
+    """deflate bodies without the zlib header still decode."""
+    compress = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    raw = compress.compress(b"<p>steenbok</p>") + compress.flush()
+    response = httpx.Response(
+        200,
+        headers={"content-type": "text/html", "content-encoding": "deflate"},
+        stream=httpx.ByteStream(raw),
+    )
+    _, content = fetch_mod._do_fetch(_mock_client(response), "https://example.edu/")
+    assert content == b"<p>steenbok</p>"
+
+
+def test_gzip_bomb_rejected():
+    """A 50 MB gzip bomb raises instead of coming back truncated as success."""
+    bomb = gzip.compress(b"a" * (50 * 1024 * 1024))
+    response = httpx.Response(
+        200,
+        headers={"content-type": "text/html", "content-encoding": "gzip"},
+        stream=httpx.ByteStream(bomb),
+    )
+    with pytest.raises(FetchError, match="compression ratio"):
+        fetch_mod._do_fetch(_mock_client(response), "https://example.edu/")
+
+
+def test_redirect_body_not_read(monkeypatch):
+    """3xx bodies are dropped unread rather than drained."""
+    class _Unreadable(httpx.SyncByteStream):
+        def __iter__(self):
+            raise AssertionError("redirect body was read")
+
+    def handler(request):
+        if request.url.path == "/old":
+            return httpx.Response(
+                302, headers={"location": "/new"}, stream=_Unreadable()
+            )
+        return httpx.Response(200, headers={"content-type": "text/plain"}, content=b"ok")
+
+    monkeypatch.setattr(fetch_mod, "_validate_redirect_target", lambda *args: None)
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    _, content = fetch_mod._do_fetch(client, "https://example.edu/old")
+    assert content == b"ok"
+
+
+@pytest.fixture
+def extract_pool(monkeypatch):
+    """A one-worker extraction pool, torn down after the test."""
+    monkeypatch.setattr(fetch_mod, "_EXTRACT_POOL", None)
+    fetch_mod.start_extract_pool(1)
+    yield
+    fetch_mod._EXTRACT_POOL.shutdown(wait=False, cancel_futures=True)
+
+
+def test_run_extract_inline_without_pool(monkeypatch):
+    """Without a started pool, extractors run in-process."""
+    monkeypatch.setattr(fetch_mod, "_EXTRACT_POOL", None)
+    assert fetch_mod._run_extract(str.upper, "steenbok") == "STEENBOK"
+
+
+def test_run_extract_in_pool(extract_pool):
+    """Extractors run in the worker; their errors come back unchanged."""
+    assert fetch_mod._run_extract(str.upper, "steenbok") == "STEENBOK"
+    with pytest.raises(ExtractionError, match="exceeds maximum size"):
+        fetch_mod._run_extract(
+            fetch_mod._extract_text_pdf, b"x" * (fetch_mod.MAX_PDF_BYTES + 1)
+        )
+
+
+def test_pool_worker_import_has_no_side_effects(extract_pool):
+    """Workers import src.fetch without building a client or log listener."""
+    probe = (
+        "(__import__('importlib').import_module('src.fetch')._CLIENT,"
+        " __import__('logging').getLogger('steenbok.fetch').handlers)"
+    )
+    assert fetch_mod._run_extract(eval, probe) == (None, [])
+
+
+def test_run_extract_timeout(extract_pool, monkeypatch):
+    """An extraction that outlives EXTRACT_TIMEOUT_SEC raises ExtractionError."""
+    monkeypatch.setattr(fetch_mod, "EXTRACT_TIMEOUT_SEC", 0.2)
+    with pytest.raises(ExtractionError, match="timed out"):
+        fetch_mod._run_extract(time.sleep, 2)
+
+
+def test_run_extract_replaces_broken_pool(extract_pool):
+    """A crashed worker raises ExtractionError and the pool is replaced."""
+    import os
+
+    broken = fetch_mod._EXTRACT_POOL
+    with pytest.raises(ExtractionError, match="crashed"):
+        fetch_mod._run_extract(os._exit, 1)
+    assert fetch_mod._EXTRACT_POOL is not broken
+    assert fetch_mod._run_extract(str.upper, "ok") == "OK"